@@ -7,27 +7,142 @@ WPS API模块
 """
 
 import base64
-import time
-import random
+import functools
+import http.cookiejar
+import os
 import string
+import threading
+import time
 import requests
 import json
 import logging
-from typing import Dict, Optional
-from Crypto.Cipher import AES, PKCS1_v1_5
-from Crypto.PublicKey import RSA
-from Crypto.Util.Padding import pad
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, ClassVar, Dict, Optional, Union
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# cryptography 在首次加解密时才导入，读取配置失败等提前退出的场景不承担导入开销
+if TYPE_CHECKING:
+    from cryptography.hazmat.primitives.asymmetric.rsa import RSAPublicKey
+
+try:
+    import orjson
+except ImportError:  # orjson为可选依赖，未安装时使用标准库json
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
 
+# 签到相关接口(获取公钥、签到)的URL前缀，签到POST可安全重试
+SIGN_IN_URL_PREFIX = 'https://personal-bus.wps.cn/sign_in/'
+
+
+def _build_retry(allowed_methods: frozenset) -> Retry:
+    """
+    构造指数退避重试策略，重试耗尽后返回最后一次响应，由调用方按状态码处理
+
+    Args:
+        allowed_methods (frozenset): 允许重试的HTTP方法
+
+    Returns:
+        Retry: 重试策略
+    """
+    return Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=allowed_methods,
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+
+
+def create_session(pool_maxsize: int = 8) -> requests.Session:
+    """
+    创建带连接池和重试策略的HTTP会话
+
+    Args:
+        pool_maxsize (int): 每个主机的最大连接数，默认8
+
+    Returns:
+        requests.Session: 配置好的会话对象
+    """
+    session = requests.Session()
+    # 会话可能被多个账号共享，拒绝写入响应Cookie，避免账号之间串Cookie
+    session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+    # 在连接层对临时性错误做指数退避重试，重试复用连接池且不会重新获取公钥/重新加密。
+    # 默认只重试GET：抽奖等POST请求重复发送会多消耗抽奖次数，不能重试
+    session.mount('https://', HTTPAdapter(
+        pool_connections=4, pool_maxsize=pool_maxsize,
+        max_retries=_build_retry(frozenset(['GET']))
+    ))
+    # 签到接口重复提交只会返回'has sign'(按成功处理)，单独挂载允许重试POST的适配器
+    session.mount(SIGN_IN_URL_PREFIX, HTTPAdapter(
+        pool_connections=1, pool_maxsize=pool_maxsize,
+        max_retries=_build_retry(frozenset(['GET', 'POST']))
+    ))
+    return session
+
+
+def loads_json(data: bytes) -> Any:
+    """解析JSON字节串，已安装orjson时使用orjson"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def parse_json_response(response: requests.Response) -> Any:
+    """解析响应体JSON，已安装orjson时直接解析原始字节"""
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return response.json()
+
+
+def dumps_json(obj: Any, pretty: bool = False) -> str:
+    """
+    序列化为JSON字符串，已安装orjson时使用orjson
+
+    Args:
+        obj (Any): 待序列化对象
+        pretty (bool): 是否缩进2格输出(用于日志)，默认输出紧凑格式
+
+    Returns:
+        str: JSON字符串
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0).decode('utf-8')
+    if pretty:
+        return json.dumps(obj, indent=2, ensure_ascii=False)
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False)
+
+
+# 签到明文的固定结构，与 {"user_id": ..., "platform": ...} 的紧凑JSON一致
+_PLAIN_DATA_TEMPLATE = b'{"user_id":%d,"platform":%d}'
+
+# AES密钥随机部分的字符集(36个字符)
+_AES_KEY_CHARS = string.ascii_lowercase + string.digits
+
+
+@functools.lru_cache(maxsize=8)
+def _load_rsa_public_key(public_key_pem: str) -> 'RSAPublicKey':
+    """解析PEM公钥，按公钥缓存避免重复解析"""
+    from cryptography.hazmat.primitives.serialization import load_pem_public_key
+    return load_pem_public_key(public_key_pem.encode('utf-8'))
+
+
+@functools.lru_cache(maxsize=8)
+def _decode_public_key(public_key_base64: str) -> str:
+    """将Base64编码的公钥解码为PEM字符串，按公钥缓存"""
+    return base64.b64decode(public_key_base64).decode('utf-8')
+
+
 class WPSEncryption:
     """WPS加密工具类"""
 
     @staticmethod
     def generate_aes_key(length: int = 32) -> str:
         """
-        生成AES密钥: 随机字符 + 时间戳
+        生成AES密钥: 随机字符(os.urandom，密码学安全) + 时间戳
 
         Args:
             length (int): 密钥长度，默认32位
@@ -35,8 +150,12 @@ class WPSEncryption:
         Returns:
             str: 生成的AES密钥
         """
-        chars = string.ascii_lowercase + string.digits
-        random_part = ''.join(random.choice(chars) for _ in range(length - 10))
+        # 一次系统调用取足随机字节；只保留 < 252 (36的整数倍) 的字节以避免取模偏差
+        count = length - 10
+        chars = []
+        while len(chars) < count:
+            chars.extend(_AES_KEY_CHARS[b % 36] for b in os.urandom(count + 8) if b < 252)
+        random_part = ''.join(chars[:count])
         timestamp_part = str(int(time.time()))
         return random_part + timestamp_part
 
@@ -52,53 +171,80 @@ class WPSEncryption:
         Returns:
             str: Base64编码的加密结果
         """
-        # 将密钥转为bytes并零填充到32字节
-        key_bytes = aes_key.encode('utf-8')
-        key_padded = key_bytes + b'\x00' * (32 - len(key_bytes))
+        return WPSEncryption.aes_encrypt_bytes(plain_text.encode('utf-8'), aes_key)
 
-        # 使用前16位作为IV
-        iv = aes_key[:16].encode('utf-8')
+    @staticmethod
+    def aes_encrypt_bytes(plain_bytes: bytes, aes_key: str) -> str:
+        """
+        AES-CBC加密(明文已是bytes，无需再次编码)
 
-        # 创建AES加密器 (CBC模式)
-        cipher = AES.new(key_padded, AES.MODE_CBC, iv)
+        Args:
+            plain_bytes (bytes): 明文字节
+            aes_key (str): AES密钥
 
-        # PKCS7填充
-        plain_bytes = plain_text.encode('utf-8')
-        padded_data = pad(plain_bytes, AES.block_size)
+        Returns:
+            str: Base64编码的加密结果
+        """
+        from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+        # 将密钥转为bytes并零填充到32字节，前16字节作为IV
+        key_bytes = aes_key.encode('utf-8')
+        encryptor = Cipher(algorithms.AES(key_bytes.ljust(32, b'\x00')), modes.CBC(key_bytes[:16])).encryptor()
+
+        # PKCS7填充 (内联计算，避免创建padder对象)
+        pad_len = 16 - (len(plain_bytes) & 15)
+        padded_data = plain_bytes + bytes((pad_len,)) * pad_len
 
         # 加密并返回Base64
-        encrypted = cipher.encrypt(padded_data)
-        return base64.b64encode(encrypted).decode('utf-8')
+        encrypted = encryptor.update(padded_data) + encryptor.finalize()
+        return base64.b64encode(encrypted).decode('ascii')
 
     @staticmethod
-    def rsa_encrypt(plain_text: str, public_key_pem: str) -> str:
+    def rsa_encrypt(plain_text: str, public_key_pem: Union[str, 'RSAPublicKey']) -> str:
         """
-        RSA加密
+        RSA加密 (PKCS1 v1.5填充)
 
         Args:
             plain_text (str): 明文文本
-            public_key_pem (str): PEM格式的RSA公钥
+            public_key_pem (Union[str, RSAPublicKey]): PEM格式的RSA公钥，或已加载的公钥对象
 
         Returns:
             str: Base64编码的加密结果
         """
-        public_key = RSA.import_key(public_key_pem)
-        cipher = PKCS1_v1_5.new(public_key)
-        encrypted = cipher.encrypt(plain_text.encode('utf-8'))
+        from cryptography.hazmat.primitives.asymmetric import padding
+
+        if isinstance(public_key_pem, str):
+            public_key = _load_rsa_public_key(public_key_pem)
+        else:
+            public_key = public_key_pem
+        encrypted = public_key.encrypt(plain_text.encode('utf-8'), padding.PKCS1v15())
         return base64.b64encode(encrypted).decode('utf-8')
 
 
 class WPSAPI:
     """WPS API类"""
 
-    def __init__(self, cookies: str, user_agent: Optional[str] = None):
+    # RSA公钥对所有账号相同，类级别缓存并持久化到config目录，冷启动时也可复用
+    _key_cache: ClassVar[Dict] = {}
+    _key_cache_lock: ClassVar[threading.Lock] = threading.Lock()
+    _key_cache_ttl: ClassVar[int] = 3600
+    _key_cache_file: ClassVar[Path] = Path(__file__).resolve().parent.parent.parent / 'config' / '.wps_pubkey.json'
+
+    # 签到必需的登录态Cookie，缺失时不发起任何请求
+    REQUIRED_COOKIES: ClassVar[tuple] = ('wps_sid',)
+
+    def __init__(self, cookies: str, user_agent: Optional[str] = None,
+                 session: Optional[requests.Session] = None):
         """
         初始化API类
 
         Args:
             cookies (str): Cookie字符串
             user_agent (Optional[str]): 用户代理字符串，可选
+            session (Optional[requests.Session]): 共享的HTTP会话，可选；
+                不传时自行创建。Cookie和请求头按账号随请求发送，不写入会话
         """
+        self.cookie_str = cookies
         self.cookies = self._parse_cookies(cookies)
         self.user_agent = user_agent or (
             'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) '
@@ -123,11 +269,73 @@ class WPSAPI:
             'referer': 'https://personal-act.wps.cn/',
             'priority': 'u=1, i'
         }
-        self.encrypt_key_url = 'https://personal-bus.wps.cn/sign_in/v1/encrypt/key'
-        self.sign_in_url = 'https://personal-bus.wps.cn/sign_in/v1/sign_in'
+        self.encrypt_key_url = SIGN_IN_URL_PREFIX + 'v1/encrypt/key'
+        self.sign_in_url = SIGN_IN_URL_PREFIX + 'v1/sign_in'
         self.lottery_url = 'https://personal-act.wps.cn/activity-rubik/activity/component_action'
         self.user_info_url = 'https://personal-act.wps.cn/activity-rubik/activity/page_info'
         self.encryption = WPSEncryption()
+        # 活动页请求头按(活动编号, 页面编号)缓存，抽奖循环中无需重复构造
+        self._activity_headers: Dict[tuple, Dict[str, str]] = {}
+
+        # 复用Session的连接池，保持与服务端的keep-alive连接
+        self._owns_session = session is None
+        self.session = session if session is not None else create_session()
+
+    def close(self):
+        """关闭自行创建的HTTP会话，共享会话由创建方负责关闭"""
+        if self._owns_session:
+            self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _get_activity_headers(self, activity_number: str, page_number: str) -> Dict[str, str]:
+        """
+        获取活动页接口(用户信息、抽奖)使用的请求头
+
+        Args:
+            activity_number (str): 活动编号
+            page_number (str): 页面编号
+
+        Returns:
+            Dict[str, str]: 请求头字典，调用方不应修改
+        """
+        cache_key = (activity_number, page_number)
+        headers = self._activity_headers.get(cache_key)
+        if headers is None:
+            headers = {
+                **self.base_headers,
+                'referer': f'https://personal-act.wps.cn/rubik2/portal/{activity_number}/{page_number}?cs_from=&mk_key=JkVKsOtv4aCLMdNdAKwUGoz9tfKeFZVKyjEe&position=mac_grzx_sign',
+                'sec-fetch-site': 'same-origin',
+                'sec-fetch-mode': 'cors',
+                'sec-fetch-dest': 'empty'
+            }
+            self._activity_headers[cache_key] = headers
+        return headers
+
+    def missing_cookies(self, required: Optional[tuple] = None) -> list:
+        """
+        检查必需的Cookie是否存在且非空
+
+        Args:
+            required (Optional[tuple]): 必需的Cookie名称，默认使用REQUIRED_COOKIES
+
+        Returns:
+            list: 缺失的Cookie名称列表，为空表示检查通过
+        """
+        if required is None:
+            required = self.REQUIRED_COOKIES
+        # 宽松解析：按';'分割并去除空白，兼容"a=1;b=2"这类没有空格的写法。
+        # 仅用于检查，实际发送的Cookie仍由_parse_cookies生成
+        present = {
+            key.strip()
+            for key, _, value in (item.partition('=') for item in self.cookie_str.split(';'))
+            if value.strip()
+        }
+        return [name for name in required if name not in present]
 
     @staticmethod
     def _parse_cookies(cookie_str: str) -> Dict[str, str]:
@@ -140,12 +348,7 @@ class WPSAPI:
         Returns:
             Dict[str, str]: Cookie字典
         """
-        cookies = {}
-        for item in cookie_str.split('; '):
-            if '=' in item:
-                key, value = item.split('=', 1)
-                cookies[key] = value
-        return cookies
+        return dict(item.split('=', 1) for item in cookie_str.split('; ') if '=' in item)
 
     def get_user_info(self, activity_number: str = "HD2025031821201822",
                       page_number: str = "YM2025041617143388") -> Dict:
@@ -175,11 +378,7 @@ class WPSAPI:
 
         try:
             # 构造请求头
-            headers = self.base_headers.copy()
-            headers['referer'] = f'https://personal-act.wps.cn/rubik2/portal/{activity_number}/{page_number}?cs_from=&mk_key=JkVKsOtv4aCLMdNdAKwUGoz9tfKeFZVKyjEe&position=mac_grzx_sign'
-            headers['sec-fetch-site'] = 'same-origin'
-            headers['sec-fetch-mode'] = 'cors'
-            headers['sec-fetch-dest'] = 'empty'
+            headers = self._get_activity_headers(activity_number, page_number)
 
             # 构造请求参数
             params = {
@@ -188,20 +387,21 @@ class WPSAPI:
             }
 
             # 发送GET请求
-            response = requests.get(
+            response = self.session.get(
                 self.user_info_url,
                 headers=headers,
                 cookies=self.cookies,
                 params=params,
-                timeout=30
+                timeout=(5, 30)
             )
 
-            logger.debug(f"用户信息请求URL: {response.url}")
-            logger.debug(f"用户信息响应状态码: {response.status_code}")
-            logger.debug(f"用户信息响应内容: {response.text}")
+            logger.debug("用户信息请求URL: %s", response.url)
+            logger.debug("用户信息响应状态码: %s", response.status_code)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("用户信息响应内容: %s", response.text)
 
             response.raise_for_status()
-            result = response.json()
+            result = parse_json_response(response)
 
             if result.get('result') == 'ok' and 'data' in result:
                 data_list = result.get('data', [])
@@ -250,6 +450,14 @@ class WPSAPI:
                 return user_info
             else:
                 error_msg = result.get('msg', '未知错误')
+                # 检查是否是token过期
+                if result.get('code') == 2000000 and result.get('ext_msg', '') == 'userNotLogin':
+                    logger.error("❌ Token已过期，请重新登录")
+                    return {
+                        'success': False,
+                        'error': 'Token已过期，请重新登录',
+                        'error_type': 'token_expired'
+                    }
                 logger.error(f"❌ 获取用户信息失败: {error_msg}")
                 return {
                     'success': False,
@@ -289,15 +497,15 @@ class WPSAPI:
         logger.info("正在获取RSA加密公钥...")
 
         try:
-            response = requests.get(
+            response = self.session.get(
                 self.encrypt_key_url,
                 headers=self.base_headers,
                 cookies=self.cookies,
-                timeout=30
+                timeout=(5, 30)
             )
             response.raise_for_status()
 
-            result = response.json()
+            result = parse_json_response(response)
 
             if result.get('result') == 'ok' and 'data' in result:
                 public_key_base64 = result['data']
@@ -329,6 +537,89 @@ class WPSAPI:
                 'error': error_msg
             }
 
+    @classmethod
+    def set_key_cache_dir(cls, cache_dir: Path):
+        """
+        设置公钥缓存文件所在目录(通常为配置文件所在目录)，并清空内存缓存
+
+        Args:
+            cache_dir (Path): 缓存目录
+        """
+        with cls._key_cache_lock:
+            cls._key_cache_file = Path(cache_dir) / '.wps_pubkey.json'
+            cls._key_cache.clear()
+
+    @classmethod
+    def _load_key_cache_file(cls) -> Dict:
+        """从缓存文件读取公钥，文件不存在或损坏时返回空字典"""
+        try:
+            with open(cls._key_cache_file, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            if (isinstance(cache, dict)
+                    and isinstance(cache.get('pem'), str) and cache['pem']
+                    and isinstance(cache.get('fetched_at'), (int, float))
+                    and isinstance(cache.get('ttl', cls._key_cache_ttl), (int, float))):
+                return cache
+        except (OSError, ValueError):
+            pass
+        return {}
+
+    @classmethod
+    def _save_key_cache_file(cls, cache: Dict):
+        """将公钥写入缓存文件(先写临时文件再替换，避免并发写入留下残缺文件)，写入失败不影响签到"""
+        tmp_path = cls._key_cache_file.with_name(f'{cls._key_cache_file.name}.{os.getpid()}.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(cache, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, cls._key_cache_file)
+        except OSError as e:
+            logger.debug("写入公钥缓存失败: %s", e)
+
+    @classmethod
+    def _invalidate_key_cache(cls):
+        """清除公钥缓存（内存和文件）"""
+        with cls._key_cache_lock:
+            cls._key_cache.clear()
+            try:
+                cls._key_cache_file.unlink()
+            except OSError:
+                pass
+
+    def get_cached_encrypt_key(self) -> Dict:
+        """
+        获取RSA加密公钥，优先使用缓存
+
+        缓存未命中或已过期时调用get_encrypt_key，并发时只有一个线程实际请求
+
+        Returns:
+            Dict: 同get_encrypt_key，命中缓存时额外包含 'cached': True
+        """
+        with WPSAPI._key_cache_lock:
+            cache = WPSAPI._key_cache
+            if not cache:
+                cache.update(self._load_key_cache_file())
+
+            if cache and time.time() - cache['fetched_at'] < cache.get('ttl', self._key_cache_ttl):
+                logger.info("✅ 使用缓存的RSA加密公钥")
+                return {
+                    'success': True,
+                    'public_key': cache['pem'],
+                    'cached': True
+                }
+
+            key_result = self.get_encrypt_key()
+            if key_result['success']:
+                cache.clear()
+                cache.update({
+                    'pem': key_result['public_key'],
+                    'fetched_at': time.time(),
+                    'ttl': self._key_cache_ttl
+                })
+                self._save_key_cache_file(cache)
+            return key_result
+
     def generate_crypto_data(self, public_key_base64: str, user_id: int, platform: int = 64) -> Dict:
         """
         生成加密数据和token
@@ -348,28 +639,32 @@ class WPSAPI:
         """
 
         # 解码公钥
-        public_key_pem = base64.b64decode(public_key_base64).decode('utf-8')
+        public_key_pem = _decode_public_key(public_key_base64)
 
         # 生成AES密钥
         aes_key = self.encryption.generate_aes_key(32)
 
-        # 准备明文数据
-        plain_data = json.dumps({
-            "user_id": user_id,
-            "platform": platform
-        }, separators=(',', ':'))
+        # 准备明文数据: 结构固定，整数字段直接套用字节模板，无需JSON序列化
+        if type(user_id) is int and type(platform) is int:
+            plain_data = _PLAIN_DATA_TEMPLATE % (user_id, platform)
+        else:
+            plain_data = dumps_json({
+                "user_id": user_id,
+                "platform": platform
+            }).encode('utf-8')
 
         # AES加密数据 (这是extra)
-        encrypt_data = self.encryption.aes_encrypt(plain_data, aes_key)
+        encrypt_data = self.encryption.aes_encrypt_bytes(plain_data, aes_key)
 
         # RSA加密AES密钥 (这是请求头中的token)
         token = self.encryption.rsa_encrypt(aes_key, public_key_pem)
 
-        logger.debug(f"User ID: {user_id}")
-        logger.debug(f"Plain Data: {plain_data}")
-        logger.debug(f"AES Key: {aes_key}")
-        logger.debug(f"Extra: {encrypt_data}")
-        logger.debug(f"Token (请求头): {token}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("User ID: %s", user_id)
+            logger.debug("Plain Data: %s", plain_data.decode('utf-8'))
+            logger.debug("AES Key: %s", aes_key)
+            logger.debug("Extra: %s", encrypt_data)
+            logger.debug("Token (请求头): %s", token)
 
         return {
             "extra": encrypt_data,
@@ -395,8 +690,8 @@ class WPSAPI:
         logger.info("开始签到...")
 
         try:
-            # 1. 获取RSA公钥
-            key_result = self.get_encrypt_key()
+            # 1. 获取RSA公钥（优先使用缓存）
+            key_result = self.get_cached_encrypt_key()
             if not key_result['success']:
                 return {
                     'success': False,
@@ -405,12 +700,16 @@ class WPSAPI:
 
             public_key_base64 = key_result['public_key']
 
-            # 2. 生成加密数据和token
-            crypto_result = self.generate_crypto_data(public_key_base64, user_id)
+            # 2. 生成加密数据和token (缓存的公钥无法解析时清除缓存，下次重新获取)
+            try:
+                crypto_result = self.generate_crypto_data(public_key_base64, user_id)
+            except Exception:
+                if key_result.get('cached'):
+                    self._invalidate_key_cache()
+                raise
 
             # 3. 构造请求头 (使用生成的token)
-            headers = self.base_headers.copy()
-            headers['token'] = crypto_result['token']
+            headers = {**self.base_headers, 'token': crypto_result['token']}
 
             # 4. 构造请求数据
             data = {
@@ -419,25 +718,27 @@ class WPSAPI:
                 "pay_origin": "pc_ucs_rwzx_sign"
             }
 
-            logger.debug(f"请求URL: {self.sign_in_url}")
-            logger.debug(f"请求头Token: {crypto_result['token'][:50]}...")
-            logger.debug(f"请求数据: {json.dumps(data, indent=2)}")
+            logger.debug("请求URL: %s", self.sign_in_url)
+            logger.debug("请求头Token: %.50s...", crypto_result['token'])
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("请求数据: %s", dumps_json(data, pretty=True))
 
             # 5. 发送请求
-            response = requests.post(
+            response = self.session.post(
                 self.sign_in_url,
                 headers=headers,
                 cookies=self.cookies,
                 json=data,
-                timeout=30
+                timeout=(5, 30)
             )
 
-            logger.debug(f"响应状态码: {response.status_code}")
-            logger.debug(f"响应内容: {response.text}")
+            logger.debug("响应状态码: %s", response.status_code)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("响应内容: %s", response.text)
 
             # 6. 解析响应
             if response.status_code == 200:
-                resp_data = response.json()
+                resp_data = parse_json_response(response)
                 if resp_data.get('result') == 'ok':
                     logger.info("✅ 签到成功!")
                     return {
@@ -468,6 +769,9 @@ class WPSAPI:
                         }
                     else:
                         logger.error(f"❌ 签到失败: {error_msg}")
+                        # 缓存的公钥可能已失效，清除后下次重新获取
+                        if key_result.get('cached'):
+                            self._invalidate_key_cache()
                         return {
                             'success': False,
                             'error': error_msg
@@ -527,11 +831,7 @@ class WPSAPI:
             logger.info("正在执行抽奖...")
             try:
                 # 构造请求头
-                headers = self.base_headers.copy()
-                headers['referer'] = f'https://personal-act.wps.cn/rubik2/portal/{activity_number}/{page_number}?cs_from=&mk_key=JkVKsOtv4aCLMdNdAKwUGoz9tfKeFZVKyjEe&position=mac_grzx_sign'
-                headers['sec-fetch-site'] = 'same-origin'
-                headers['sec-fetch-mode'] = 'cors'
-                headers['sec-fetch-dest'] = 'empty'
+                headers = self._get_activity_headers(activity_number, page_number)
                 # 构造请求数据
                 data = {
                     "component_uniq_number": {
@@ -551,20 +851,22 @@ class WPSAPI:
                         "session_id": session_id
                     }
                 }
-                logger.debug(f"抽奖请求URL: {self.lottery_url}")
-                logger.debug(f"抽奖请求数据: {json.dumps(data, indent=2, ensure_ascii=False)}")
+                logger.debug("抽奖请求URL: %s", self.lottery_url)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("抽奖请求数据: %s", dumps_json(data, pretty=True))
                 # 发送POST请求
-                response = requests.post(
+                response = self.session.post(
                     self.lottery_url,
                     headers=headers,
                     cookies=self.cookies,
                     json=data,
-                    timeout=30
+                    timeout=(5, 30)
                 )
-                logger.debug(f"抽奖响应状态码: {response.status_code}")
-                logger.debug(f"抽奖响应内容: {response.text}")
+                logger.debug("抽奖响应状态码: %s", response.status_code)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("抽奖响应内容: %s", response.text)
                 response.raise_for_status()
-                result = response.json()
+                result = parse_json_response(response)
                 # 检查响应结果
                 if result.get('result') == 'ok' and 'data' in result:
                     data_obj = result.get('data', {})
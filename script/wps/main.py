@@ -22,18 +22,27 @@ Updated: 2025-12-18
 
 import json
 import logging
+import os
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Any
 from pathlib import Path
 
-from api import WPSAPI
+from api import WPSAPI, create_session, loads_json
 
 # 获取项目根目录
 project_root = Path(__file__).resolve().parent.parent.parent
 sys.path.insert(0, str(project_root))
 
-# 导入需要的模块
-from notification import send_notification, NotificationSound
+logger = logging.getLogger(__name__)
+
+# 日志分隔线
+SEPARATOR = "=" * 60
+
+# WPS签到按北京时间自然日重置
+CST = timezone(timedelta(hours=8))
 
 
 class WPSTasks:
@@ -53,36 +62,20 @@ class WPSTasks:
             self.config_path = Path(config_path)
 
         self.accounts: List[Dict[str, Any]] = []
-        self.logger = self._setup_logger()
+        self.logger = logger
         self._init_accounts()
         self.account_results: List[Dict[str, Any]] = []
 
-    def _setup_logger(self) -> logging.Logger:
-        """
-        设置日志记录器
-
-        Returns:
-            logging.Logger: 配置好的日志记录器
-        """
-        logger = logging.getLogger(__name__)
-        logger.setLevel(logging.INFO)
+        # 账号之间并发执行，所有账号共享同一个连接池，Cookie随每个请求单独发送
+        self.max_workers = max(1, min(16, len(self.accounts)))
+        self.http = create_session(pool_maxsize=self.max_workers)
 
-        # 创建控制台处理器
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-
-        # 设置日志格式
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        console_handler.setFormatter(formatter)
-
-        # 避免重复添加处理器
-        if not logger.handlers:
-            logger.addHandler(console_handler)
-
-        return logger
+        # 本地签到记录: user_id -> 最近一次签到成功的日期(ISO格式)，与配置文件放在同一目录
+        self.state_path = self.config_path.parent / ".wps_state.json"
+        # 公钥缓存同样放在配置文件所在目录
+        WPSAPI.set_key_cache_dir(self.config_path.parent)
+        self._state_lock = threading.Lock()
+        self._state = self._load_state()
 
     def _init_accounts(self):
         """从配置文件中读取账号信息"""
@@ -91,11 +84,12 @@ class WPSTasks:
             raise FileNotFoundError(f"配置文件不存在: {self.config_path}")
 
         try:
-            with open(self.config_path, 'r', encoding='utf-8') as f:
-                config_data = json.load(f)
-                # 从统一配置文件的 wps 节点读取
-                wps_config = config_data.get('wps', {})
-                self.accounts = wps_config.get('accounts', [])
+            # 一次性读取字节后解析，已安装orjson时使用orjson
+            with open(self.config_path, 'rb') as f:
+                raw = f.read()
+            config_data = loads_json(raw)
+            # 从统一配置文件的 wps 节点读取，只保留账号列表
+            self.accounts = config_data.get('wps', {}).get('accounts', [])
 
             if not self.accounts:
                 self.logger.warning("配置文件中没有找到 wps 账号信息")
@@ -109,6 +103,48 @@ class WPSTasks:
             self.logger.error(f"读取配置文件失败: {e}")
             raise
 
+    def _load_state(self) -> Dict[str, str]:
+        """读取本地签到记录，文件不存在或损坏时返回空字典"""
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            return state if isinstance(state, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _is_signed_today(self, user_id: Any) -> bool:
+        """
+        根据本地记录判断账号今日是否已签到
+
+        Args:
+            user_id (Any): 用户ID
+
+        Returns:
+            bool: 今日已签到返回True
+        """
+        with self._state_lock:
+            last_date = self._state.get(str(user_id))
+        return last_date == datetime.now(CST).date().isoformat()
+
+    def _mark_signed_today(self, user_id: Any):
+        """
+        记录账号今日已签到并写入文件，写入失败不影响任务
+
+        Args:
+            user_id (Any): 用户ID
+        """
+        with self._state_lock:
+            self._state[str(user_id)] = datetime.now(CST).date().isoformat()
+            tmp_path = self.state_path.with_suffix('.tmp')
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self._state, f, ensure_ascii=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.state_path)
+            except OSError as e:
+                self.logger.warning(f"⚠️ 写入签到记录失败: {e}")
+
     def process_account(self, account_info: Dict[str, Any]) -> Dict[str, Any]:
         """
         处理单个账号的签到和抽奖任务
@@ -120,9 +156,9 @@ class WPSTasks:
             Dict[str, Any]: 处理结果
         """
         account_name = account_info.get('account_name', '未命名账号')
-        self.logger.info(f"\n{'=' * 60}")
+        self.logger.info(f"\n{SEPARATOR}")
         self.logger.info(f"开始处理账号: {account_name}")
-        self.logger.info(f"{'=' * 60}")
+        self.logger.info(SEPARATOR)
 
         result = {
             'account_name': account_name,
@@ -134,6 +170,7 @@ class WPSTasks:
             'user_info': {}
         }
 
+        api = None
         try:
             # 获取账号配置
             user_id = account_info.get('user_id')
@@ -154,14 +191,40 @@ class WPSTasks:
                 return result
 
             # 创建API实例
-            api = WPSAPI(cookies=cookies, user_agent=user_agent)
+            api = WPSAPI(cookies=cookies, user_agent=user_agent, session=self.http)
+
+            # Cookie中缺少登录态时直接跳过，不发起注定失败的请求
+            required_cookies = account_info.get('required_cookies')
+            if isinstance(required_cookies, str):
+                required_cookies = (required_cookies,)
+            elif isinstance(required_cookies, list):
+                required_cookies = tuple(required_cookies)
+            elif required_cookies is not None:
+                error_msg = "账号配置中required_cookies格式错误，应为Cookie名称列表"
+                self.logger.error(f"❌ {account_name} {error_msg}")
+                result['message'] = error_msg
+                return result
+            missing = api.missing_cookies(required_cookies)
+            if missing:
+                error_msg = f"Cookie中缺少登录信息: {', '.join(missing)}，请重新获取Cookie"
+                self.logger.error(f"❌ {account_name} {error_msg}")
+                result['message'] = error_msg
+                return result
 
             # 执行签到（通过签到接口判断token是否过期）
-            self.logger.info(f"\n{'=' * 60}")
+            self.logger.info(f"\n{SEPARATOR}")
             self.logger.info(f"{account_name} - 执行签到")
-            self.logger.info(f"{'=' * 60}")
+            self.logger.info(SEPARATOR)
 
-            sign_result = api.sign_in(user_id=user_id)
+            # 本地记录显示今日已签到时跳过签到请求（获取公钥、加密、签到），继续后续抽奖流程
+            signed_from_cache = self._is_signed_today(user_id)
+            if signed_from_cache:
+                self.logger.info(f"✅ {account_name} 本地记录显示今日已签到，跳过签到请求")
+                sign_result = {'success': True, 'already_signed': True, 'data': {}}
+            else:
+                sign_result = api.sign_in(user_id=user_id)
+                if sign_result['success']:
+                    self._mark_signed_today(user_id)
 
             if sign_result['success']:
                 result['success'] = True
@@ -206,9 +269,9 @@ class WPSTasks:
                     return result
 
             # 获取签到后的用户信息（包含最新的抽奖次数）
-            self.logger.info(f"\n{'=' * 60}")
+            self.logger.info(f"\n{SEPARATOR}")
             self.logger.info(f"{account_name} - 获取签到后的用户信息")
-            self.logger.info(f"{'=' * 60}")
+            self.logger.info(SEPARATOR)
 
             user_info_result = api.get_user_info()
 
@@ -218,15 +281,21 @@ class WPSTasks:
                 self.logger.info(f"📊 抽奖次数: {user_info_result.get('lottery_times', 0)} 次")
                 self.logger.info(f"💰 当前积分: {user_info_result.get('points', 0)}")
                 self.logger.info(f"⏰ 即将过期积分: {user_info_result.get('advent_points', 0)}")
+            elif signed_from_cache and user_info_result.get('error_type') == 'token_expired':
+                # 跳过了签到请求时，登录态只能由这里发现；按签到时Token过期处理，跳过后续任务
+                result['success'] = False
+                result['message'] = 'Token已过期，请重新登录'
+                self.logger.error(f"❌ {account_name} Token已过期，请重新登录")
+                return result
             else:
                 error_msg = user_info_result.get('error', '获取用户信息失败')
                 self.logger.warning(f"⚠️ {account_name} 获取用户信息失败: {error_msg}")
                 # 获取用户信息失败不影响后续流程，继续执行
 
             # 执行抽奖任务
-            self.logger.info(f"\n{'=' * 60}")
+            self.logger.info(f"\n{SEPARATOR}")
             self.logger.info(f"{account_name} - 执行抽奖任务")
-            self.logger.info(f"{'=' * 60}")
+            self.logger.info(SEPARATOR)
 
             # 获取抽奖次数和组件信息
             lottery_times = result['user_info'].get('lottery_times', 0)
@@ -313,9 +382,9 @@ class WPSTasks:
                 self.logger.info(f"📭 {account_name} 没有抽奖次数")
 
             # 获取任务完成后的最新用户信息
-            self.logger.info(f"\n{'=' * 60}")
+            self.logger.info(f"\n{SEPARATOR}")
             self.logger.info(f"{account_name} - 获取任务完成后的最新信息")
-            self.logger.info(f"{'=' * 60}")
+            self.logger.info(SEPARATOR)
 
             final_user_info = api.get_user_info()
             if final_user_info['success']:
@@ -334,32 +403,32 @@ class WPSTasks:
             result['message'] = error_msg
             import traceback
             traceback.print_exc()
+        finally:
+            if api is not None:
+                api.close()
 
         return result
 
     def run(self):
         """执行所有账号的签到和抽奖任务"""
-        import random
-        import time
-
-        self.logger.info("=" * 60)
+        self.logger.info(SEPARATOR)
         self.logger.info("WPS自动签到和抽奖任务开始")
-        self.logger.info("=" * 60)
+        self.logger.info(SEPARATOR)
 
         if not self.accounts:
             self.logger.warning("没有需要处理的账号")
             return
 
-        # 处理每个账号
-        for idx, account_info in enumerate(self.accounts):
-            result = self.process_account(account_info)
-            self.account_results.append(result)
-
-            # 在处理完一个账号后，如果还有下一个账号，则等待5-10秒
-            if idx < len(self.accounts) - 1:
-                delay = random.uniform(5, 10)
-                self.logger.info(f"\n⏱️  等待 {delay:.1f} 秒后处理下一个账号...")
-                time.sleep(delay)
+        try:
+            # 并发处理每个账号，结果只在主线程中按账号顺序收集；
+            # 线程名(wps_0、wps_1...)写入日志，用于区分并发账号的日志
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='wps') as executor:
+                futures = [executor.submit(self.process_account, account_info)
+                           for account_info in self.accounts]
+                for future in futures:
+                    self.account_results.append(future.result())
+        finally:
+            self.http.close()
 
         # 输出统计信息
         self._print_summary()
@@ -368,18 +437,20 @@ class WPSTasks:
         self._send_notification()
 
     def _print_summary(self):
-        """打印执行结果统计"""
-        self.logger.info("\n" + "=" * 60)
-        self.logger.info("执行结果统计")
-        self.logger.info("=" * 60)
-
+        """打印执行结果统计（拼接成一条日志输出）"""
         total = len(self.account_results)
         success = sum(1 for r in self.account_results if r['success'])
         failed = total - success
 
-        self.logger.info(f"总账号数: {total}")
-        self.logger.info(f"签到成功: {success}")
-        self.logger.info(f"签到失败: {failed}")
+        lines = [
+            "",
+            SEPARATOR,
+            "执行结果统计",
+            SEPARATOR,
+            f"总账号数: {total}",
+            f"签到成功: {success}",
+            f"签到失败: {failed}"
+        ]
 
         # 统计抽奖信息
         prize_summary = {}
@@ -404,20 +475,67 @@ class WPSTasks:
                 total_successful_draws += lottery_info.get('successful_draws', 0)
 
         if total_attempts > 0:
-            self.logger.info(f"\n📊 抽奖统计: 总共尝试 {total_attempts} 次，成功 {total_successful_draws} 次")
+            lines.append(f"\n📊 抽奖统计: 总共尝试 {total_attempts} 次，成功 {total_successful_draws} 次")
 
         if prize_summary:
-            self.logger.info("\n🎁 奖品统计:")
-            for prize, count in prize_summary.items():
-                self.logger.info(f"  {prize}: {count}个")
+            lines.append("\n🎁 奖品统计:")
+            lines.extend(f"  {prize}: {count}个" for prize, count in prize_summary.items())
+
+        # 详细结果
+        lines.append("\n详细结果:")
+        lines.extend(
+            f"  {r['account_name']}: {'✅ 成功' if r['success'] else '❌ 失败'} - {r['message']}"
+            for r in self.account_results
+        )
+        lines.append(SEPARATOR)
 
-        # 打印详细结果
-        self.logger.info("\n详细结果:")
-        for result in self.account_results:
-            status = "✅ 成功" if result['success'] else "❌ 失败"
-            self.logger.info(f"  {result['account_name']}: {status} - {result['message']}")
+        self.logger.info("\n".join(lines))
+
+    @staticmethod
+    def _format_account_notification(result: Dict[str, Any]) -> str:
+        """
+        构造单个账号的通知内容
+
+        Args:
+            result (Dict[str, Any]): 账号处理结果
+
+        Returns:
+            str: 该账号的通知文本
+        """
+        status = "✅" if result['success'] else "❌"
+        lines = [f"{status} {result['account_name']}: {result['message']}"]
+
+        # 添加签到奖励信息
+        sign_rewards = result.get('sign_rewards', [])
+        if sign_rewards:
+            lines.append(f"    🎁 签到奖励: {', '.join(sign_rewards)}")
+
+        # 添加抽奖结果信息
+        lottery_info = result.get('lottery_info')
+        if lottery_info:
+            lottery_results = lottery_info.get('results', [])
+            if lottery_results:
+                lines.append("    🎲 抽奖结果:")
+                for idx, single_result in enumerate(lottery_results, 1):
+                    if single_result['success']:
+                        # 直接从single_result获取prize_name，因为api.py返回的数据结构中prize_name在第一层
+                        prize_name = single_result.get('prize_name', '未知')
+                        lines.append(f"       第{idx}次: {prize_name}")
+                    else:
+                        # 抽奖失败的情况
+                        error_msg = single_result.get('error', '抽奖失败')
+                        lines.append(f"       第{idx}次: {error_msg}")
+
+        # 添加账户信息
+        final_info = result.get('final_user_info', {}) or {}
+        if final_info.get('success'):
+            lines.append(
+                f"    📊 账户信息: 抽奖次数 {final_info.get('lottery_times', 0)} | 积分 {final_info.get('points', 0)} | 即将过期 {final_info.get('advent_points', 0)}"
+            )
+        else:
+            lines.append("    ⚠️ 账户信息获取失败")
 
-        self.logger.info("=" * 60)
+        return "\n".join(lines)
 
     def _send_notification(self):
         """发送推送通知"""
@@ -440,48 +558,14 @@ class WPSTasks:
         ]
 
         content_lines.append("📋 详细结果:")
-        for result in self.account_results:
-            status = "✅" if result['success'] else "❌"
-            content_lines.append(f"{status} {result['account_name']}: {result['message']}")
-
-            # 添加签到奖励信息
-            sign_rewards = result.get('sign_rewards', [])
-            if sign_rewards:
-                content_lines.append(f"    🎁 签到奖励: {', '.join(sign_rewards)}")
-
-            # 添加抽奖结果信息
-            lottery_info = result.get('lottery_info')
-            if lottery_info:
-                lottery_results = lottery_info.get('results', [])
-                if lottery_results:
-                    content_lines.append("    🎲 抽奖结果:")
-                    for idx, single_result in enumerate(lottery_results, 1):
-                        if single_result['success']:
-                            # 直接从single_result获取prize_name，因为api.py返回的数据结构中prize_name在第一层
-                            prize_name = single_result.get('prize_name', '未知')
-                            content_lines.append(f"       第{idx}次: {prize_name}")
-                        else:
-                            # 抽奖失败的情况
-                            error_msg = single_result.get('error', '抽奖失败')
-                            content_lines.append(f"       第{idx}次: {error_msg}")
-
-            # 添加账户信息
-            final_info = result.get('final_user_info', {}) or {}
-            if final_info.get('success'):
-                content_lines.append(
-                    f"    📊 账户信息: 抽奖次数 {final_info.get('lottery_times', 0)} | 积分 {final_info.get('points', 0)} | 即将过期 {final_info.get('advent_points', 0)}"
-                )
-            else:
-                content_lines.append("    ⚠️ 账户信息获取失败")
-
-            # 在每个账号之间添加空行（最后一个账号除外）
-            if result != self.account_results[-1]:
-                content_lines.append("")
+        content_lines.append("\n\n".join(self._format_account_notification(r) for r in self.account_results))
 
         content = "\n".join(content_lines)
 
-        # 发送通知
+        # 发送通知 (通知模块只在需要推送时导入)
         try:
+            from notification import send_notification, NotificationSound
+
             send_notification(
                 title=title,
                 content=content,
@@ -513,4 +597,10 @@ def main():
 
 
 if __name__ == "__main__":
+    # 配置日志
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(threadName)s - %(name)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
     main()
\ No newline at end of file